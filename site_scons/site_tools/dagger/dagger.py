@@ -35,8 +35,9 @@ To generate the graph, run the command "SCons dagger"
 #     limitations under the License.
 
 import logging
+import multiprocessing
 import subprocess
-import sys
+from multiprocessing.pool import ThreadPool
 
 import SCons
 
@@ -48,55 +49,40 @@ LIB_DB = [] # Stores every SCons library nodes
 OBJ_DB = [] # Stores every SCons object file node
 EXE_DB = {} # Stores every SCons executable node, with the object files that build into it {Executable: [object files]}
 
-def list_process(items):
-    """From WIL, converts lists generated from an NM command with unicode strings to lists
-    with ascii strings
-    """
 
-    r = []
-    for l in items:
-        if isinstance(l, list):
-            for i in l:
-                if i.startswith('.L'):
-                    continue
-                else:
-                    r.append(str(i))
+# TODO: Use the python library to read elf files,
+# so we know the file exists at this point
+def get_symbol_worker(object_file):
+    """From WIL, launches a worker subprocess which collects both the symbols
+    required and the symbols defined by an object file. A single nm listing is
+    split on its symbol type column, so each object file is only read once.
+    Returns a (used, defined) tuple of symbol lists."""
+
+    cmd = r'nm "' + object_file + r'" | c++filt'
+
+    # This runs on several threads at once. Without close_fds, Python 2 lets a
+    # pipeline forked on one thread inherit another thread's stdout pipe, which
+    # would then not see EOF until that unrelated pipeline exits.
+    p = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, close_fds=True)
+
+    used = []
+    defined = []
+    for line in p.stdout:
+        # Each line is a 16 character address (blank for undefined symbols),
+        # the symbol type, and the symbol name. Local labels (.L) are skipped.
+        line = line.decode().rstrip('\n')
+        symbol = line[19:]
+        if symbol == '' or symbol.startswith('.L'):
+            continue
+
+        if line[17:19] == 'U ':
+            used.append(str(symbol))
         else:
-            if l.startswith('.L'):
-                continue
-            else:
-                r.append(str(l))
-    return r
+            defined.append(str(symbol))
 
+    p.wait()
 
-# TODO: Use the python library to read elf files,
-# so we know the file exists at this point
-def get_symbol_worker(object_file, task):
-    """From WIL, launches a worker subprocess which collects either symbols defined
-    or symbols required by an object file"""
-
-    platform = 'linux' if sys.platform.startswith('linux') else 'darwin'
-
-    if platform == 'linux':
-        if task == 'used':
-            cmd = r'nm "' + object_file + r'" | grep -e "U " | c++filt'
-        elif task == 'defined':
-            cmd = r'nm "' + object_file + r'" | grep -v -e "U " | c++filt'
-    elif platform == 'darwin':
-        if task == 'used':
-            cmd = "nm -u " + object_file + " | c++filt"
-        elif task == 'defined':
-            cmd = "nm -jU " + object_file + " | c++filt"
-
-    p = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE)
-    uses = p.communicate()[0].decode()
-
-    if platform == 'linux':
-        return list_process([use[19:] for use in uses.split('\n')
-                             if use != ''])
-    elif platform == 'darwin':
-        return list_process([use.strip() for use in uses.split('\n')
-                             if use != ''])
+    return used, defined
 
 
 def emit_obj_db_entry(target, source, env):
@@ -104,14 +90,14 @@ def emit_obj_db_entry(target, source, env):
     built into a global variable for later use"""
 
     for t in target:
-        if str(t) is None:
+        if t is None:
             continue
         OBJ_DB.append(t)
     return target, source
 
 def emit_prog_db_entry(target, source, env):
     for t in target:
-        if str(t) is None:
+        if t is None:
             continue
         EXE_DB[t] = [str(s) for s in source]
 
@@ -121,7 +107,7 @@ def emit_lib_db_entry(target, source, env):
     """Emitter for libraries. We add each library
     into our global variable"""
     for t in target:
-        if str(t) is None:
+        if t is None:
             continue
         LIB_DB.append(t)
     return target, source
@@ -164,15 +150,14 @@ def __generate_lib_rels(lib, g):
         lib_node.add_defined_file(obj_node.id)
 
 
-def __generate_sym_rels(obj, g):
+def __generate_sym_rels(object_path, symbols, g):
     """Generate all to symbol dependency and definition location information
+    from the (used, defined) symbols collected for an object file
     """
 
-    object_path = str(obj)
     file_node = g.find_node(object_path, graph_consts.NODE_FILE)
 
-    symbols_used = get_symbol_worker(object_path, task="used")
-    symbols_defined = get_symbol_worker(object_path, task="defined")
+    symbols_used, symbols_defined = symbols
 
     for symbol in symbols_defined:
         symbol_node = g.find_node(symbol, graph_consts.NODE_SYM)
@@ -189,19 +174,20 @@ def __generate_sym_rels(obj, g):
         g.add_edge(graph_consts.FIL_SYM, file_node.id, symbol_node.id)
 
 
-def __generate_file_rels(obj, g):
+def __generate_file_rels(object_path, g):
     """Generate all file to file and by extension, file to library and library
     to file relationships
     """
-    file_node = g.get_node(str(obj))
+    file_node = g.get_node(object_path)
 
     if file_node is None:
         return
 
-    if file_node.id not in g.get_edge_type(graph_consts.FIL_SYM):
+    symbols_used = g.get_edge_type(graph_consts.FIL_SYM).get(file_node.id)
+    if symbols_used is None:
         return
 
-    for symbol in g.get_edge_type(graph_consts.FIL_SYM)[file_node.id]:
+    for symbol in symbols_used:
         symbol = g.get_node(symbol)
         objs = symbol.files
         if objs is None:
@@ -234,11 +220,22 @@ def write_obj_db(target, source, env):
     for lib in LIB_DB:
         __generate_lib_rels(lib, g)
 
-    for obj in OBJ_DB:
-        __generate_sym_rels(obj, g)
-
-    for obj in OBJ_DB:
-        __generate_file_rels(obj, g)
+    # Collecting symbols is dominated by the nm subprocesses, which are
+    # independent per object file, so run them concurrently. The graph itself
+    # is only ever updated from this thread, and each object's symbols are
+    # applied and released as soon as they arrive.
+    object_paths = [str(obj) for obj in OBJ_DB]
+    pool = ThreadPool(multiprocessing.cpu_count())
+    try:
+        symbols_by_object = pool.imap(get_symbol_worker, object_paths)
+        for idx, symbols in enumerate(symbols_by_object):
+            __generate_sym_rels(object_paths[idx], symbols, g)
+    finally:
+        pool.close()
+        pool.join()
+
+    for object_path in object_paths:
+        __generate_file_rels(object_path, g)
 
     for exe in EXE_DB.keys():
         __generate_exe_rels(exe, g)
@@ -90,12 +90,11 @@ class Graph(object):
     def find_node(self, id, type):
         """returns the node if it exists, otherwise, generates
         it"""
-        if self.get_node(id) is not None:
-            return self.get_node(id)
-        else:
+        node = self.get_node(id)
+        if node is None:
             node = node_factory(id, type)
             self.add_node(node)
-            return node
+        return node
 
     def get_edge_type(self, edge_type):
         return self._edges[edge_type]
@@ -122,18 +121,25 @@ class Graph(object):
         if any(item is None for item in (from_node, to_node, from_node_obj, to_node_obj)):
             raise ValueError
 
-        self._edges[relationship][from_node].add(to_node)
+        # An edge that already exists has already had its incoming edges
+        # propagated, so there is nothing left to do for it
+        to_nodes = self._edges[relationship][from_node]
+        if to_node in to_nodes:
+            return
+
+        to_nodes.add(to_node)
 
         to_node_obj.add_incoming_edges(from_node_obj, self)
 
     # JSON does not support python sets, so we need to convert each
-    # set of edges to lists
+    # set of edges to lists. They are sorted so that the export is stable
+    # from one run to the next
     def export_to_json(self, filename="graph.json"):
         node_index = {}
 
         data = {"edges": [], "nodes": []}
 
-        for idx, id in enumerate(self._nodes.keys()):
+        for idx, id in enumerate(sorted(self._nodes)):
             node = self.get_node(id)
             node_index[id] = idx
             node_dict = {}
@@ -143,7 +149,7 @@ class Graph(object):
 
             for property, value in vars(node).iteritems():
                 if isinstance(value, set):
-                    node_dict["node"][property] = list(value)
+                    node_dict["node"][property] = sorted(value)
                 else:
                     node_dict["node"][property] = value
 
@@ -151,10 +157,9 @@ class Graph(object):
 
         for edge_type in graph_consts.RELATIONSHIP_TYPES:
             edges_dict = self._edges[edge_type]
-            for node in edges_dict.keys():
-                to_nodes = list(self._edges[edge_type][node])
+            for node, to_nodes in sorted(edges_dict.iteritems()):
                 to_nodes_dicts = [{"index": node_index[to_node], "id": to_node}
-                                  for to_node in to_nodes]
+                                  for to_node in sorted(to_nodes)]
 
                 data["edges"].append({"type": edge_type,
                                       "from_node": {"id": node,
@@ -162,7 +167,7 @@ class Graph(object):
                                       "to_node": to_nodes_dicts})
 
         with open(filename, 'w') as outfile:
-            json.dump(data, outfile, indent=4, encoding="ascii")
+            json.dump(data, outfile, separators=(",", ":"), encoding="ascii")
 
     def __str__(self):
         return ("<Number of Nodes : {0}, Number of Edges : {1}, "
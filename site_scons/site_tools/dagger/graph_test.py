@@ -183,6 +183,25 @@ class TestGraphMethods(unittest.TestCase, CustomAssertions):
         self.assertEquals(self.to_node_file.dependent_files,
                           set([self.from_node_file.id]))
 
+    def test_add_edge_duplicate(self):
+        calls = []
+        add_incoming_edges = self.to_node_file.add_incoming_edges
+
+        def counting_add_incoming_edges(from_node, g):
+            calls.append(from_node.id)
+            add_incoming_edges(from_node, g)
+
+        self.to_node_file.add_incoming_edges = counting_add_incoming_edges
+
+        self.g.add_edge(graph_consts.FIL_FIL, self.from_node_file.id,
+                        self.to_node_file.id)
+        self.g.add_edge(graph_consts.FIL_FIL, self.from_node_file.id,
+                        self.to_node_file.id)
+
+        self.assertEquals(self.g.edges[graph_consts.FIL_FIL][
+            self.from_node_file.id], set([self.to_node_file.id]))
+        self.assertEquals(calls, [self.from_node_file.id])
+
     def test_export_to_json(self):
         generated_graph = generate_graph()
         generated_graph.export_to_json("export_test.json")